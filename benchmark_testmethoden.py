@@ -0,0 +1,167 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Benchmark- und Regressionssuite für das Testmethoden-Tool
+# Treibt das classification_form über Streamlits headless AppTest durch alle Antwortkombinationen und misst je Rerun
+# Wall-Time, Anzahl ausgegebener Elemente, Regelauswertung, Excel-Erzeugung (Zeit und Größe) sowie den Speicher-Peak.
+# Die dabei abgeschickten Bewertungen landen in einer temporären Historie, nicht in der des Tools.
+#
+#   python benchmark_testmethoden.py --speichern benchmark_baseline.json      Baseline aufnehmen
+#   python benchmark_testmethoden.py --vergleiche benchmark_baseline.json     gegen Baseline prüfen (Exit-Code 1 bei
+#                                                                             Regression über der Schwelle)
+
+APP = Path(__file__).parent / "testmethoden_tool_streamlit.py"
+STANDARD_SCHWELLE = 0.25  # 25 % Verschlechterung gegenüber der Baseline gelten als Regression
+
+# Kennzahlen, bei denen ein höherer Wert schlechter ist
+KENNZAHLEN = ("rerun_ms", "elemente", "regelauswertung_ms", "excel_ms", "excel_bytes", "speicher_peak_kib")
+
+
+def _zaehle_elemente(knoten):
+    """ Zählt alle ausgegebenen Elemente (ohne Container) im Elementbaum von AppTest """
+    kinder = getattr(knoten, "children", None)
+    if kinder is None:
+        return 1
+    return sum(_zaehle_elemente(kind) for kind in kinder.values())
+
+
+def _p95(werte):
+    werte = sorted(werte)
+    return werte[min(len(werte) - 1, int(round(0.95 * (len(werte) - 1))))]
+
+
+def messe(anzahl=None):
+    """ Spielt alle (oder die ersten `anzahl`) Antwortkombinationen durch und gibt die Messwerte je Kombination zurück """
+    from streamlit.testing.v1 import AppTest
+
+    from testmethoden_export import erstelle_excel
+    from testmethoden_metriken import METRIKEN
+    from testmethoden_regeln import FELDER, antwortraum
+
+    kombinationen = list(itertools.islice(antwortraum(), anzahl))
+    at = AppTest.from_file(str(APP), default_timeout=30)
+    at.run()
+
+    messungen = []
+    tracemalloc.start()
+    for antworten in kombinationen:
+        at.text_input[0].set_value("Benchmark-System")
+        for selectbox, antwort in zip(at.selectbox, antworten):
+            selectbox.set_value(antwort)
+        at.button[0].click()
+
+        regel_vorher = METRIKEN.phasen_summe("regelauswertung")
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        at.run()
+        rerun = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if at.exception:
+            raise RuntimeError(f"Fehler im Rerun für {antworten}: {at.exception[0].message}")
+        regelauswertung = METRIKEN.phasen_summe("regelauswertung") - regel_vorher
+
+        ergebnis = at.session_state["ergebnis"]
+        start = time.perf_counter()
+        excel = erstelle_excel(ergebnis["system_name"], ergebnis["system_description"],
+                               ergebnis["test_recommendations"])
+        excel_dauer = time.perf_counter() - start
+
+        messungen.append({
+            "antworten": dict(zip(FELDER, antworten)),
+            "rerun_ms": rerun * 1000,
+            "elemente": _zaehle_elemente(at._tree),
+            "regelauswertung_ms": regelauswertung * 1000,
+            "excel_ms": excel_dauer * 1000,
+            "excel_bytes": len(excel),
+            "speicher_peak_kib": peak / 1024,
+        })
+    tracemalloc.stop()
+    return messungen
+
+
+def zusammenfassen(messungen):
+    """ Median, p95 und Maximum je Kennzahl """
+    return {
+        name: {
+            "median": statistics.median(m[name] for m in messungen),
+            "p95": _p95([m[name] for m in messungen]),
+            "max": max(m[name] for m in messungen),
+        }
+        for name in KENNZAHLEN
+    }
+
+
+def vergleiche(aktuell, baseline, schwelle):
+    """ Liefert alle Kennzahlen, deren Median oder p95 die Baseline um mehr als die Schwelle überschreitet """
+    regressionen = []
+    for name in KENNZAHLEN:
+        for statistik in ("median", "p95"):
+            alt = baseline["zusammenfassung"].get(name, {}).get(statistik)
+            neu = aktuell["zusammenfassung"][name][statistik]
+            if alt is None:
+                continue
+            if neu > alt * (1 + schwelle) and neu - alt > 1e-9:
+                regressionen.append((name, statistik, alt, neu))
+    return regressionen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark für Rerun-Latenz, Elementanzahl und Excel-Export.")
+    parser.add_argument("--anzahl", type=int, help="nur die ersten N Antwortkombinationen messen (Standard: alle)")
+    parser.add_argument("--speichern", metavar="DATEI", help="Ergebnis als JSON-Baseline speichern")
+    parser.add_argument("--vergleiche", metavar="DATEI", help="Ergebnis mit einer gespeicherten Baseline vergleichen")
+    parser.add_argument("--schwelle", type=float, default=STANDARD_SCHWELLE,
+                        help="erlaubte relative Verschlechterung, z. B. 0.25 für 25 %% (Standard: %(default)s)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as ordner:
+        # Benchmark-Bewertungen in eine eigene Historie schreiben, nicht in die Portfolio-Daten des Tools
+        os.environ["TESTMETHODEN_HISTORIE"] = str(Path(ordner) / "historie.sqlite3")
+        messungen = messe(args.anzahl)
+
+        from testmethoden_historie import historie
+
+        bewertungen = historie()
+        if bewertungen is not None:
+            bewertungen.warte()  # ausstehende Schreibvorgänge abschließen, bevor der Ordner gelöscht wird
+    ergebnis = {
+        "meta": {
+            "zeitpunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "kombinationen": len(messungen),
+        },
+        "zusammenfassung": zusammenfassen(messungen),
+        "messungen": messungen,
+    }
+
+    print(f"{len(messungen)} Kombinationen gemessen")
+    for name, werte in ergebnis["zusammenfassung"].items():
+        print(f"  {name:<20} median {werte['median']:>10.2f}   p95 {werte['p95']:>10.2f}   max {werte['max']:>10.2f}")
+
+    if args.speichern:
+        Path(args.speichern).write_text(json.dumps(ergebnis, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Baseline gespeichert: {args.speichern}")
+
+    if args.vergleiche:
+        baseline = json.loads(Path(args.vergleiche).read_text(encoding="utf-8"))
+        regressionen = vergleiche(ergebnis, baseline, args.schwelle)
+        for name, statistik, alt, neu in regressionen:
+            print(f"REGRESSION {name} ({statistik}): {alt:.2f} -> {neu:.2f} (Schwelle {args.schwelle:.0%})")
+        if regressionen:
+            return 1
+        print(f"Keine Regression gegenüber {args.vergleiche} (Schwelle {args.schwelle:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
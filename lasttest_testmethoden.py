@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+# Lasttest für viele gleichzeitige Sitzungen gegen einen lokalen Streamlit-Server
+# Startet das Tool als eigenen Serverprozess und simuliert je Laststufe N Sitzungen über dasselbe Websocket-Protokoll
+# wie der Browser (/_stcore/stream): Jede Sitzung füllt das classification_form mit einem zufälligen Profil aus,
+# schickt es ab und lädt anschließend die Excel-Datei herunter. Gemessen werden die Latenz je Interaktion
+# (p50/p95/p99), der Durchsatz und der residente Speicher des Serverprozesses je Sitzung. Mehrere Laststufen ergeben
+# die Skalierungskurve; die Sitzungen einer Stufe bleiben für die nächste offen und werden nur aufgestockt. Wächst der
+# Speicher von Runde zu Runde weiter, obwohl nur dieselben Sitzungen neu rechnen, wird das als mögliches Speicherleck
+# gemeldet (Exit-Code 1).
+#
+#   python lasttest_testmethoden.py --sitzungen 1,10,25,50 --runden 12
+#   python lasttest_testmethoden.py --sitzungen 1,10,25,50 --speichern lasttest.json
+#   python lasttest_testmethoden.py --url http://host:8501 --pid 12345       bereits laufenden Server messen
+
+APP = Path(__file__).parent / "testmethoden_tool_streamlit.py"
+STANDARD_STUFEN = "1,5,10,25"
+STANDARD_RUNDEN = 8
+AUFWAERM_RUNDEN = 3  # ungemessene Interaktionen vor der ersten Stufe
+STANDARD_LECK_SCHWELLE_KIB = 64.0  # Speicherzuwachs je Runde und Sitzung, ab dem ein Leck vermutet wird
+
+BESCHREIBUNGEN = (
+    "",
+    "Internes Dashboard für technische Logdaten",
+    "Payment service handling personal data, must comply with GDPR",
+    "Migration der Datenbank in die Cloud mit Lasttests",
+    "API gateway with many external REST interfaces",
+)
+
+
+def _perzentil(werte, anteil):
+    werte = sorted(werte)
+    return werte[min(len(werte) - 1, int(round(anteil * (len(werte) - 1))))] if werte else 0.0
+
+
+def rss_kib(pid):
+    """ Residenter Speicher eines Prozesses in KiB (Linux, /proc) """
+    for zeile in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if zeile.startswith("VmRSS:"):
+            return int(zeile.split()[1])
+    raise RuntimeError(f"VmRSS für Prozess {pid} nicht gefunden")
+
+
+class Sitzung:
+    """ Eine simulierte Browser-Sitzung: Widget-Zustände senden, ForwardMsgs bis zum Ende des Reruns lesen """
+
+    def __init__(self, basis_url, nummer, zufall):
+        self.basis_url = basis_url.rstrip("/")
+        self.nummer = nummer
+        self.zufall = zufall
+        self.session_id = None
+        self.widgets = []  # (Element-Typ, Proto) in Ausgabereihenfolge des letzten Reruns
+        self.werte = {}  # Widget-ID -> (Wert-Feld, Wert)
+        self.datei_id = None
+        self._anfrage = itertools.count(1)
+
+    async def verbinde(self):
+        import websockets
+
+        ws_url = "ws" + self.basis_url[len("http"):] + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], origin=self.basis_url, max_size=None)
+        await self.rerun()
+
+    async def schliesse(self):
+        await self.ws.close()
+
+    async def _empfange(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        nachricht = ForwardMsg()
+        nachricht.ParseFromString(await self.ws.recv())
+        return nachricht
+
+    async def rerun(self, ausloeser=None):
+        """ Startet einen Rerun mit den aktuellen Widget-Zuständen und wartet auf dessen Ende; gibt die Dauer zurück """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        anfrage = BackMsg()
+        zustand = anfrage.rerun_script
+        zustand.SetInParent()  # auch ohne Widget-Zustände (erster Aufruf) als Rerun-Anfrage kennzeichnen
+        for widget_id, (feld, wert) in self.werte.items():
+            widget = zustand.widget_states.widgets.add()
+            widget.id = widget_id
+            setattr(widget, feld, wert)
+        if ausloeser:
+            widget = zustand.widget_states.widgets.add()
+            widget.id = ausloeser
+            widget.trigger_value = True
+
+        start = time.perf_counter()
+        await self.ws.send(anfrage.SerializeToString())
+        widgets, datei_id = [], None
+        while True:
+            nachricht = await self._empfange()
+            art = nachricht.WhichOneof("type")
+            if art == "new_session":
+                self.session_id = nachricht.new_session.initialize.session_id or self.session_id
+            elif art == "delta" and nachricht.delta.WhichOneof("type") == "new_element":
+                element = nachricht.delta.new_element
+                typ = element.WhichOneof("type")
+                if typ in ("selectbox", "text_input", "text_area", "button"):
+                    widgets.append((typ, getattr(element, typ)))
+                elif typ == "download_button":
+                    datei_id = element.download_button.deferred_file_id
+                elif typ == "exception":
+                    raise RuntimeError(f"Fehler im Rerun: {element.exception.message}")
+            elif art == "script_finished":
+                self.widgets, self.datei_id = widgets, datei_id
+                return time.perf_counter() - start
+
+    def _formular(self, typ):
+        return [proto for art, proto in self.widgets if art == typ and proto.form_id]
+
+    async def absenden(self, runde):
+        """ Füllt das Formular mit einem zufälligen Profil aus und schickt es ab """
+        from testmethoden_regeln import FELDER
+
+        name, = self._formular("text_input")
+        beschreibung, = self._formular("text_area")
+        self.werte[name.id] = ("string_value", f"Lasttest-{self.nummer:04d}-{runde:03d}")
+        self.werte[beschreibung.id] = ("string_value", self.zufall.choice(BESCHREIBUNGEN))
+        for selectbox, optionen in zip(self._formular("selectbox"), FELDER.values()):
+            self.werte[selectbox.id] = ("string_value", self.zufall.choice(optionen))
+        absenden, = [proto for proto in self._formular("button") if proto.is_form_submitter]
+        return await self.rerun(ausloeser=absenden.id)
+
+    async def herunterladen(self):
+        """ Fordert die (erst beim Klick erzeugte) Excel-Datei an und lädt sie herunter; gibt (Dauer, Bytes) zurück """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        if not self.datei_id:
+            raise RuntimeError("Kein Download-Button im letzten Rerun")
+        anfrage = BackMsg()
+        anfrage.backend_operation_request.request_id = f"lasttest-{next(self._anfrage)}"
+        anfrage.backend_operation_request.session_id = self.session_id
+        anfrage.backend_operation_request.deferred_file.file_id = self.datei_id
+
+        start = time.perf_counter()
+        await self.ws.send(anfrage.SerializeToString())
+        while True:
+            nachricht = await self._empfange()
+            if nachricht.WhichOneof("type") != "backend_operation_response":
+                continue
+            antwort = nachricht.backend_operation_response
+            if antwort.request_id != anfrage.backend_operation_request.request_id:
+                continue
+            if antwort.error_msg:
+                raise RuntimeError(f"Download fehlgeschlagen: {antwort.error_msg}")
+            url = antwort.deferred_file.url
+            break
+        inhalt = await asyncio.to_thread(lambda: urllib.request.urlopen(self.basis_url + url, timeout=60).read())
+        return time.perf_counter() - start, len(inhalt)
+
+
+async def laststufe(sitzungen, pid, runden, basis):
+    """ Alle Sitzungen gleichzeitig `runden` Mal absenden und herunterladen lassen """
+    anzahl = len(sitzungen)
+    latenzen = {"absenden": [], "download": []}
+    export_bytes = 0
+    download_fehler = 0
+    rss_je_runde = []
+
+    async def interaktion(sitzung, runde):
+        nonlocal export_bytes, download_fehler
+        latenzen["absenden"].append(await sitzung.absenden(runde))
+        try:
+            dauer, groesse = await sitzung.herunterladen()
+        except OSError:
+            # z. B. 404, wenn Streamlit die erzeugte Datei unter Last schon wieder aufgeräumt hat
+            download_fehler += 1
+            return
+        latenzen["download"].append(dauer)
+        export_bytes += groesse
+
+    start = time.perf_counter()
+    for runde in range(runden):
+        await asyncio.gather(*(interaktion(sitzung, runde) for sitzung in sitzungen))
+        rss_je_runde.append(rss_kib(pid))
+    dauer = time.perf_counter() - start
+
+    alle = latenzen["absenden"] + latenzen["download"]
+    # Neue Sitzungen legen in den ersten Runden noch Zustand an (Sitzungsdaten, Allokator-Arenen, begrenzter
+    # Ergebnis-Cache), und der Allokator gibt zwischendurch Speicher zurück. Als Zuwachs zählt daher, wie weit der
+    # Höchststand der zweiten Rundenhälfte über dem der ersten liegt - bei einem Plateau etwa null, bei einem Leck stetig.
+    haelfte = runden // 2
+    zuwachs = (max(rss_je_runde[haelfte:]) - max(rss_je_runde[:haelfte])) / haelfte / anzahl if haelfte else 0.0
+    return {
+        "sitzungen": anzahl,
+        "interaktionen": len(alle),
+        "durchsatz_je_s": len(alle) / dauer,
+        "latenz_ms": {
+            art: {
+                "p50": _perzentil(werte, 0.50) * 1000,
+                "p95": _perzentil(werte, 0.95) * 1000,
+                "p99": _perzentil(werte, 0.99) * 1000,
+            }
+            for art, werte in (("alle", alle), *latenzen.items())
+        },
+        "export_bytes": export_bytes,
+        "download_fehler": download_fehler,
+        "rss_basis_kib": basis,
+        "rss_kib_je_runde": rss_je_runde,
+        "rss_kib_je_sitzung": (rss_je_runde[-1] - basis) / anzahl,
+        "zuwachs_kib_je_runde_und_sitzung": zuwachs,
+    }
+
+
+async def lasttest(basis_url, pid, anzahlen, runden, seed, aufwaermen=AUFWAERM_RUNDEN):
+    """ Misst alle Laststufen nacheinander; die Sitzungen bleiben offen und werden je Stufe nur aufgestockt
+
+    Vorher füllt eine Aufwärm-Sitzung die prozessweiten Caches (Importe, Katalog, Suchindex, Historie), damit dieser
+    einmalige Speicher weder der ersten Stufe als Sitzungsbedarf noch als Zuwachs angerechnet wird. Weil die Sitzungen
+    über die Stufen hinweg bestehen bleiben, enthält der gemessene Speicher jeder Stufe wirklich alle offenen Sitzungen
+    und nicht nur wiederverwendeten Speicher bereits geschlossener.
+    """
+    aufwaermung = Sitzung(basis_url, -1, random.Random(seed))
+    await aufwaermung.verbinde()
+    for runde in range(aufwaermen):
+        await aufwaermung.absenden(runde)
+        await aufwaermung.herunterladen()
+    await aufwaermung.schliesse()
+    basis = rss_kib(pid)
+
+    sitzungen, stufen = [], []
+    try:
+        for anzahl in sorted(anzahlen):
+            neue = [Sitzung(basis_url, nummer, random.Random(seed * 100003 + nummer))
+                    for nummer in range(len(sitzungen), anzahl)]
+            await asyncio.gather(*(sitzung.verbinde() for sitzung in neue))
+            sitzungen += neue
+            stufen.append(await laststufe(sitzungen, pid, runden, basis))
+            print(f"  {anzahl} Sitzungen gemessen", file=sys.stderr)
+    finally:
+        await asyncio.gather(*(sitzung.schliesse() for sitzung in sitzungen), return_exceptions=True)
+    return stufen
+
+
+def _freier_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def starte_server(port, historie):
+    """ Startet das Tool als Streamlit-Server und wartet, bis es antwortet """
+    umgebung = dict(os.environ, TESTMETHODEN_HISTORIE=str(historie))
+    prozess = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP),
+         "--server.headless", "true", "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--server.disconnectedSessionTTL", "0", "--browser.gatherUsageStats", "false"],
+        env=umgebung, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    frist = time.monotonic() + 60
+    while time.monotonic() < frist:
+        if prozess.poll() is not None:
+            raise RuntimeError(f"Streamlit-Server beendet mit Code {prozess.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as antwort:
+                if antwort.status == 200:
+                    return prozess
+        except OSError:
+            time.sleep(0.2)
+    prozess.terminate()
+    raise RuntimeError("Streamlit-Server antwortet nicht")
+
+
+def ausgeben(stufen):
+    print(f"{'Sitzungen':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Interakt./s':>11} {'RSS MiB':>8} "
+          f"{'KiB/Sitzung':>11} {'Zuwachs KiB/Runde/Sitzung':>26} {'Downl.-Fehler':>13}")
+    for stufe in stufen:
+        latenz = stufe["latenz_ms"]["alle"]
+        print(f"{stufe['sitzungen']:>9} {latenz['p50']:>8.1f} {latenz['p95']:>8.1f} {latenz['p99']:>8.1f} "
+              f"{stufe['durchsatz_je_s']:>11.1f} {stufe['rss_kib_je_runde'][-1] / 1024:>8.1f} "
+              f"{stufe['rss_kib_je_sitzung']:>11.0f} {stufe['zuwachs_kib_je_runde_und_sitzung']:>26.1f} "
+              f"{stufe['download_fehler']:>13}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lasttest mit vielen gleichzeitigen Sitzungen gegen das Tool.")
+    parser.add_argument("--sitzungen", default=STANDARD_STUFEN,
+                        help="Laststufen als kommagetrennte Sitzungsanzahlen (Standard: %(default)s)")
+    parser.add_argument("--runden", type=int, default=STANDARD_RUNDEN,
+                        help="Absenden + Download je Sitzung und Stufe (Standard: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert für die zufälligen Profile")
+    parser.add_argument("--url", help="bereits laufenden Server verwenden, z. B. http://localhost:8501")
+    parser.add_argument("--pid", type=int, help="Prozess-ID dieses Servers (für die Speichermessung, mit --url)")
+    parser.add_argument("--leck-schwelle", type=float, default=STANDARD_LECK_SCHWELLE_KIB,
+                        help="Zuwachs in KiB je Runde und Sitzung, ab dem ein Leck gemeldet wird (Standard: %(default)s)")
+    parser.add_argument("--speichern", metavar="DATEI", help="Ergebnis als JSON speichern")
+    args = parser.parse_args(argv)
+
+    if bool(args.url) != bool(args.pid):
+        parser.error("--url und --pid nur gemeinsam angeben")
+    anzahlen = [int(teil) for teil in args.sitzungen.split(",")]
+
+    with tempfile.TemporaryDirectory() as ordner:
+        prozess = None
+        if args.url:
+            basis_url, pid = args.url, args.pid
+        else:
+            port = _freier_port()
+            prozess = starte_server(port, Path(ordner) / "historie.sqlite3")
+            basis_url, pid = f"http://127.0.0.1:{port}", prozess.pid
+        try:
+            stufen = asyncio.run(lasttest(basis_url, pid, anzahlen, args.runden, args.seed))
+        finally:
+            if prozess:
+                prozess.terminate()
+                prozess.wait(timeout=30)
+
+    ergebnis = {
+        "meta": {
+            "zeitpunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "runden": args.runden,
+        },
+        "stufen": stufen,
+    }
+    ausgeben(stufen)
+
+    if args.speichern:
+        Path(args.speichern).write_text(json.dumps(ergebnis, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Ergebnis gespeichert: {args.speichern}")
+
+    lecks = [stufe for stufe in stufen if stufe["zuwachs_kib_je_runde_und_sitzung"] > args.leck_schwelle]
+    for stufe in lecks:
+        print(f"MÖGLICHES SPEICHERLECK bei {stufe['sitzungen']} Sitzungen: "
+              f"{stufe['zuwachs_kib_je_runde_und_sitzung']:.1f} KiB je Runde und Sitzung "
+              f"(Schwelle {args.leck_schwelle:.0f} KiB)")
+    return 1 if lecks else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
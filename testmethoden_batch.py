@@ -0,0 +1,106 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+from xlsxwriter.exceptions import FileCreateError
+
+from testmethoden_export import schreibe_tabelle
+from testmethoden_regeln import EMPFEHLUNGS_LISTE, FELDER, stellenwerte
+from testmethoden_suche import STANDARD_ANZAHL, STANDARD_SCHWELLE, such_index
+
+# Stapelverarbeitung: Klassifiziert ein ganzes System-Portfolio (CSV/XLSX, eine Zeile je System)
+# mit demselben Regel-Index wie die Oberfläche und schreibt alle Ergebnisse in eine Excel-Datei. Ist eine Spalte
+# system_description vorhanden, werden zusätzlich Hinweise aus dem Freitext-Abgleich ausgegeben.
+#
+# Aufruf: python testmethoden_batch.py portfolio.csv -o Testmethoden_Portfolio.xlsx
+
+ERGEBNIS_SPALTE = "Empfohlene Testmethoden"
+STATUS_SPALTE = "Status"
+HINWEIS_SPALTE = "Hinweise aus Beschreibung"
+UNVOLLSTAENDIG = "Bitte füllen Sie alle Felder aus, bevor Sie Testmethoden anzeigen."
+
+# Nachschlagetabelle über die laufende Nummer der Antwortkombination (einmalig beim Import)
+_TEXT_NACH_NUMMER = np.array(["\n".join(methoden) for methoden in EMPFEHLUNGS_LISTE] + [""], dtype=object)
+
+
+def lese_portfolio(pfad):
+    """ Liest eine CSV- oder Excel-Datei mit einer Zeile je System; alle Werte werden als Text übernommen """
+    pfad = str(pfad)
+    if pfad.lower().endswith(".xls"):
+        # Das alte Excel-Format bräuchte xlrd, das nicht zu den Abhängigkeiten gehört
+        raise ValueError(f"{pfad}: Das Format .xls wird nicht unterstützt, bitte als .xlsx oder .csv speichern")
+    if pfad.lower().endswith(".xlsx"):
+        return pd.read_excel(pfad, dtype=str, keep_default_na=False)
+    # Trennzeichen (Komma oder Semikolon) wird automatisch erkannt
+    return pd.read_csv(pfad, dtype=str, keep_default_na=False, sep=None, engine="python", encoding="utf-8-sig")
+
+
+def klassifiziere_portfolio(portfolio):
+    """ Wertet die Regeln spaltenweise für alle Systeme aus und gibt das Portfolio mit Ergebnisspalten zurück """
+    fehlend = [feld for feld in ("system_name", *FELDER) if feld not in portfolio.columns]
+    if fehlend:
+        raise ValueError(f"Fehlende Spalten in der Eingabedatei: {', '.join(fehlend)}")
+
+    # Laufende Nummer im Antwortraum; ungültige oder leere Antworten werden auf -1 gesetzt
+    nummer = np.zeros(len(portfolio), dtype=np.int64)
+    gueltig = np.ones(len(portfolio), dtype=bool)
+    for feld, stellenwert in stellenwerte().items():
+        codes = pd.Categorical(portfolio[feld].astype(str).str.strip(), categories=FELDER[feld]).codes
+        gueltig &= codes >= 0
+        nummer += codes.astype(np.int64) * stellenwert
+    nummer = np.where(gueltig, nummer, len(EMPFEHLUNGS_LISTE))
+
+    ergebnis = portfolio.copy()
+    ergebnis[ERGEBNIS_SPALTE] = _TEXT_NACH_NUMMER[nummer]
+    ergebnis[STATUS_SPALTE] = np.where(gueltig, "OK", UNVOLLSTAENDIG)
+    if "system_description" in portfolio.columns:
+        ergebnis[HINWEIS_SPALTE] = hinweise_aus_beschreibung(portfolio["system_description"], nummer)
+    return ergebnis
+
+
+def hinweise_aus_beschreibung(beschreibungen, nummer):
+    """ Freitext-Abgleich aller Kurzbeschreibungen in einem Durchgang; bereits empfohlene Methoden werden ausgelassen """
+    index = such_index()
+    bewertungen = index.bewerte_stapel(beschreibungen.astype(str))
+
+    # Bereits empfohlene Methoden je Antwortkombination ausblenden (unvollständige Zeilen: nichts ausblenden)
+    empfohlen = np.zeros((len(EMPFEHLUNGS_LISTE) + 1, len(index.methoden)), dtype=bool)
+    spalte = {methode: i for i, methode in enumerate(index.methoden)}
+    for i, methoden in enumerate(EMPFEHLUNGS_LISTE):
+        empfohlen[i, [spalte[methode] for methode in methoden]] = True
+    bewertungen[empfohlen[nummer]] = 0
+
+    texte = np.full(len(bewertungen), "", dtype=object)
+    for zeile in np.flatnonzero((bewertungen >= STANDARD_SCHWELLE).any(axis=1)):
+        texte[zeile] = "\n".join(f"{methode} ({konfidenz:.0%})"
+                                  for methode, konfidenz in index.auswahl(bewertungen[zeile], anzahl=STANDARD_ANZAHL))
+    return texte
+
+
+def schreibe_portfolio(ergebnis, pfad):
+    """ Schreibt alle Ergebnisse zeilenweise in einem Durchgang in eine Excel-Datei """
+    spalte = ergebnis.columns.get_loc(ERGEBNIS_SPALTE)
+    schreibe_tabelle(pfad, "Portfolio", list(ergebnis.columns), ergebnis.itertuples(index=False, name=None),
+                     spaltenbreiten={spalte: 50})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Testmethoden-Empfehlungen für ein ganzes System-Portfolio berechnen.")
+    parser.add_argument("eingabe", help="CSV- oder Excel-Datei mit einer Zeile je System")
+    parser.add_argument("-o", "--ausgabe", default="Testmethoden_Portfolio.xlsx", help="Ziel-Excel-Datei")
+    args = parser.parse_args(argv)
+
+    try:
+        ergebnis = klassifiziere_portfolio(lese_portfolio(args.eingabe))
+        schreibe_portfolio(ergebnis, args.ausgabe)
+    except (ValueError, OSError, ImportError, FileCreateError) as fehler:
+        parser.exit(2, f"Fehler: {fehler}\n")
+
+    unvollstaendig = int((ergebnis[STATUS_SPALTE] != "OK").sum())
+    print(f"{len(ergebnis)} Systeme klassifiziert ({unvollstaendig} unvollständig) -> {args.ausgabe}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Prozessweiter Ergebnis-Cache für alle Sitzungen
+# Gleiche Klassifikationen liefern dieselben Empfehlungen und dieselbe Excel-Datei; beides wird deshalb nur einmal
+# pro Server-Prozess berechnet. Der Cache ist durch ein Byte-Budget begrenzt und verdrängt die am längsten nicht
+# genutzten Einträge (LRU).
+
+STANDARD_BUDGET = 64 * 1024 * 1024  # 64 MiB, über TESTMETHODEN_CACHE_BYTES anpassbar
+
+
+def _groesse(wert):
+    """ Schätzt den Speicherbedarf eines Cache-Werts in Bytes (Texte und Bytes zählen mit ihrer Länge) """
+    if isinstance(wert, (bytes, bytearray)):
+        return len(wert)
+    if isinstance(wert, str):
+        return len(wert.encode("utf-8"))
+    if isinstance(wert, dict):
+        return sum(_groesse(k) + _groesse(v) for k, v in wert.items())
+    if isinstance(wert, (list, tuple)):
+        return sum(_groesse(teil) for teil in wert)
+    return 8
+
+
+class ErgebnisCache:
+    """ Thread-sicherer LRU-Cache mit Byte-Budget sowie Zählern für Treffer, Fehlzugriffe und Verdrängungen """
+
+    def __init__(self, max_bytes=STANDARD_BUDGET):
+        self.max_bytes = max_bytes
+        self._eintraege = OrderedDict()  # Schlüssel -> (Wert, Größe)
+        self._belegt = 0
+        self._lock = threading.Lock()
+        self._in_arbeit = {}  # Schlüssel -> Lock, damit gleichzeitige Anfragen nur einmal rechnen
+        self.treffer = 0
+        self.fehlzugriffe = 0
+        self.verdraengungen = 0
+
+    def _hole(self, schluessel):
+        eintrag = self._eintraege.get(schluessel)
+        if eintrag is None:
+            return None
+        self._eintraege.move_to_end(schluessel)
+        self.treffer += 1
+        return eintrag
+
+    def hole_oder_berechne(self, schluessel, berechne):
+        """ Gibt den Wert zum Schlüssel zurück und berechnet ihn bei Bedarf genau einmal """
+        with self._lock:
+            eintrag = self._hole(schluessel)
+            if eintrag is not None:
+                return eintrag[0]
+            sperre = self._in_arbeit.setdefault(schluessel, threading.Lock())
+
+        with sperre:
+            with self._lock:
+                eintrag = self._hole(schluessel)
+                if eintrag is not None:
+                    return eintrag[0]
+                self.fehlzugriffe += 1
+            try:
+                wert = berechne()
+                self.lege_ab(schluessel, wert)
+            finally:
+                with self._lock:
+                    self._in_arbeit.pop(schluessel, None)
+        return wert
+
+    def lege_ab(self, schluessel, wert):
+        """ Speichert einen Wert und verdrängt ältere Einträge, bis das Byte-Budget eingehalten ist """
+        groesse = _groesse(wert)
+        with self._lock:
+            if schluessel in self._eintraege:
+                self._belegt -= self._eintraege.pop(schluessel)[1]
+            if groesse > self.max_bytes:
+                return  # Einzelwert größer als das gesamte Budget wird nicht gespeichert
+            self._eintraege[schluessel] = (wert, groesse)
+            self._belegt += groesse
+            while self._belegt > self.max_bytes:
+                _, (_, alt) = self._eintraege.popitem(last=False)
+                self._belegt -= alt
+                self.verdraengungen += 1
+
+    def leeren(self):
+        with self._lock:
+            self._eintraege.clear()
+            self._belegt = 0
+
+    def statistik(self):
+        """ Aktuelle Kennzahlen des Caches """
+        with self._lock:
+            return {
+                "eintraege": len(self._eintraege),
+                "belegt_bytes": self._belegt,
+                "max_bytes": self.max_bytes,
+                "treffer": self.treffer,
+                "fehlzugriffe": self.fehlzugriffe,
+                "verdraengungen": self.verdraengungen,
+            }
+
+
+# Gemeinsame Instanz für alle Sitzungen im Server-Prozess
+ERGEBNIS_CACHE = ErgebnisCache(int(os.environ.get("TESTMETHODEN_CACHE_BYTES", STANDARD_BUDGET)))
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from io import BytesIO
+
+from testmethoden_cache import ERGEBNIS_CACHE
+from testmethoden_katalog import katalog
+from testmethoden_metriken import METRIKEN
+from testmethoden_regeln import empfohlene_testmethoden, normalisiere
+
+# Excel-Export der Empfehlungen
+# Die Arbeitsmappe wird erst erzeugt, wenn der Download tatsächlich angefordert wird, und pro Eingabe-Hash
+# im prozessweiten Ergebnis-Cache abgelegt, sodass wiederholte Downloads derselben Empfehlung - auch aus anderen
+# Sitzungen - die fertigen Bytes wiederverwenden.
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def eingabe_hash(system_name, system_description, antworten):
+    """ Stabiler Hash über alle Eingaben, die den Inhalt der Excel-Datei bestimmen """
+    daten = json.dumps([system_name, system_description, antworten], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(daten.encode("utf-8")).hexdigest()
+
+
+def export_eintrag(methode):
+    """ Bereitet eine Testmethode für den Excel-Export auf """
+    return {
+        "Testmethode": methode.name,
+        "Beschreibung": methode.description,
+        "Häufige Probleme": "\n".join(methode.problems),
+        "Best Practices": "\n".join(methode.best_practices),
+        "Eingesetzte Tools": "\n".join([f"{cat}: {', '.join(lst)}" for cat, lst in methode.tools.items()])
+    }
+
+
+def empfehlungs_eintraege(antworten, katalog_stand=None):
+    """ Export-Einträge aller empfohlenen Testmethoden, einmal pro Klassifikation und Katalogversion berechnet """
+    katalog_stand = katalog_stand or katalog()
+    klassifikation = normalisiere(antworten)
+    return ERGEBNIS_CACHE.hole_oder_berechne(
+        ("empfehlung", klassifikation, katalog_stand.version),
+        lambda: tuple(export_eintrag(katalog_stand.methoden[methode])
+                      for methode in empfohlene_testmethoden(klassifikation))
+    )
+
+
+def _neue_arbeitsmappe(ziel):
+    """ Arbeitsmappe im Constant-Memory-Modus: Zeilen werden sofort auf die Platte geschrieben statt im Speicher gehalten """
+    import xlsxwriter  # erst beim Export laden, damit der Kaltstart der Oberfläche ohne xlsxwriter auskommt
+
+    return xlsxwriter.Workbook(ziel, {"constant_memory": True})
+
+
+def erstelle_excel(system_name, system_description, test_recommendations):
+    """ Baut die Arbeitsmappe mit System-Angaben und Testmethoden-Übersicht und gibt sie als Bytes zurück """
+    with METRIKEN.messe("arbeitsmappe_schreiben"):
+        return _schreibe_empfehlung(system_name, system_description, test_recommendations)
+
+
+def _schreibe_empfehlung(system_name, system_description, test_recommendations):
+    output = BytesIO()
+    workbook = _neue_arbeitsmappe(output)
+    worksheet = workbook.add_worksheet("Testmethoden")
+
+    # Formatierung für besseren Export
+    wrap_format = workbook.add_format({'text_wrap': True, 'valign': 'top'})  # Mehrzeilig & oben ausgerichtet
+    bold_format = workbook.add_format({'bold': True, 'text_wrap': True, 'valign': 'top'})  # Mehrzeilig mit Fettschrift
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})  # Tabellenkopf
+
+    # Im Constant-Memory-Modus müssen Spalten- und Zeilenformate gesetzt sein, bevor die Zeile geschrieben wird
+    if test_recommendations:
+        # **Spaltenbreite begrenzen (max 50 Zeichen)**
+        worksheet.set_column(0, len(test_recommendations), 50, wrap_format)  # Max. 50 Zeichen Breite
+
+    # System-/Service-Name & Beschreibung platzieren
+    worksheet.write(0, 0, "System-/Service-Name:", bold_format)
+    worksheet.write(0, 1, system_name, wrap_format)
+    worksheet.write(1, 0, "Beschreibung:", bold_format)
+    worksheet.write(1, 1, system_description, wrap_format)
+
+    # Testmethoden-Übersicht ab Zeile 4, je Testmethode eine Spalte (Falls keine Empfehlungen existieren, wird das verhindert)
+    if test_recommendations:
+        worksheet.write_row(3, 0, ["", *(rec.get("Testmethode", "Unbenannte Methode") for rec in test_recommendations)],
+                            header_format)
+
+        zeilen = (
+            ("Beschreibung", lambda rec: rec.get("Beschreibung", "")),
+            ("Häufige Probleme", lambda rec: "\n".join(rec.get("Häufige Probleme", "").split(". "))),  # Automatischer Umbruch nach Punkten
+            ("Best Practices", lambda rec: "\n".join(rec.get("Best Practices", "").split(". "))),
+            ("Eingesetzte Tools", lambda rec: rec.get("Eingesetzte Tools", "")),
+        )
+        for row_num, (bezeichnung, wert) in enumerate(zeilen, start=4):
+            # **Zeilenhöhe für bessere Lesbarkeit** ("Beschreibung" höher, restliche Zeilen 30)
+            worksheet.set_row(row_num, 50 if row_num == 4 else 30, wrap_format)
+            worksheet.write_row(row_num, 0, [bezeichnung, *(wert(rec) for rec in test_recommendations)])
+
+    workbook.close()
+    return output.getvalue()
+
+
+def schreibe_tabelle(ziel, blattname, kopfzeile, zeilen, spaltenbreiten=None, zeilenhoehe=None):
+    """ Schreibt beliebig viele Zeilen aus einem Iterator direkt in eine Arbeitsmappe (konstanter Speicherbedarf)
+
+    Formate und Spaltenbreiten werden einmal je Spalte festgelegt, die Zeilenhöhe einmal als Standard für das Blatt;
+    die Zeilen selbst werden ohne Zwischenspeicherung nacheinander geschrieben. Gibt die Anzahl der Datenzeilen zurück.
+    """
+    workbook = _neue_arbeitsmappe(ziel)
+    worksheet = workbook.add_worksheet(blattname)
+    wrap_format = workbook.add_format({'text_wrap': True, 'valign': 'top'})
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+
+    for spalte, breite in (spaltenbreiten or {}).items():
+        worksheet.set_column(spalte, spalte, breite, wrap_format)
+    if zeilenhoehe:
+        worksheet.set_default_row(zeilenhoehe)
+    worksheet.freeze_panes(1, 1)
+
+    worksheet.write_row(0, 0, kopfzeile, header_format)
+    anzahl = 0
+    for anzahl, zeile in enumerate(zeilen, start=1):
+        worksheet.write_row(anzahl, 0, zeile)
+
+    workbook.close()
+    return anzahl
+
+
+def excel_export(schluessel, system_name, system_description, test_recommendations, katalog_version):
+    """ Liefert die Excel-Bytes zu Eingabe-Hash und Katalogversion; gebaut wird nur beim ersten Download """
+    return ERGEBNIS_CACHE.hole_oder_berechne(
+        ("excel", schluessel, katalog_version),
+        lambda: erstelle_excel(system_name, system_description, test_recommendations)
+    )
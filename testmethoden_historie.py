@@ -0,0 +1,284 @@
+import atexit
+import datetime
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+from testmethoden_regeln import FELDER
+
+# Bewertungshistorie in einer lokalen SQLite-Datenbank
+# Jede abgeschickte Klassifikation wird mit Zeitpunkt, Katalogversion und den empfohlenen Testmethoden gespeichert.
+# Schreibzugriffe landen in einer Warteschlange und werden von einem Hintergrund-Thread gesammelt in einer Transaktion
+# geschrieben, damit der Rerun nicht auf die Platte wartet. Die empfohlenen Methoden liegen zusätzlich als Bitmaske vor
+# (ein Bit je Methode, Zuordnung in der Tabelle `methoden`), sodass Auswertungen wie "wie viele Systeme brauchen
+# Sicherheitstests" per GROUP BY über wenige hundert Masken laufen. Abdeckende Indizes über Maske und alle
+# Filterspalten (einer davon nach System-Namen sortiert für die Präfixsuche) erlauben diese Auswertung, ohne die
+# Tabellenzeilen selbst zu lesen. Die jeweils letzte Bewertung eines
+# Systems ist mit `aktuell = 1` markiert; Bewertungen ohne System-Namen bleiben alle aktuell.
+
+HISTORIE_DATEI = Path(os.environ.get("TESTMETHODEN_HISTORIE", Path(__file__).parent / "testmethoden_historie.sqlite3"))
+BATCH_GROESSE = 500  # maximale Anzahl Bewertungen je Schreib-Transaktion
+SCHREIB_INTERVALL = 0.5  # Sekunden, die der Schreib-Thread auf weitere Bewertungen wartet
+WARTE_FRIST = 10.0  # Sekunden, die warte() (z. B. beim Beenden) höchstens auf ausstehende Bewertungen wartet
+SEITEN_GROESSE = 50
+MAX_METHODEN = 63  # Bits in einer SQLite-Ganzzahl
+
+FILTER_SPALTEN = ("system_name", *FELDER, "katalog_version")
+
+logger = logging.getLogger("testmethoden")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS bewertungen (
+    id INTEGER PRIMARY KEY,
+    zeitpunkt TEXT NOT NULL,
+    system_name TEXT NOT NULL,
+    system_description TEXT NOT NULL,
+    {", ".join(f"{feld} TEXT NOT NULL" for feld in FELDER)},
+    katalog_version TEXT NOT NULL,
+    methoden_maske INTEGER NOT NULL,
+    testmethoden TEXT NOT NULL,
+    aktuell INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS methoden (
+    bit INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+{"".join(f"CREATE INDEX IF NOT EXISTS ix_bewertungen_{spalte} ON bewertungen ({spalte});"
+         for spalte in (*FELDER, "katalog_version", "zeitpunkt"))}
+CREATE INDEX IF NOT EXISTS ix_bewertungen_auswertung
+    ON bewertungen (methoden_maske, aktuell, {", ".join(FELDER)}, katalog_version);
+DROP INDEX IF EXISTS ix_bewertungen_system_name;
+CREATE INDEX IF NOT EXISTS ix_bewertungen_name_auswertung
+    ON bewertungen (system_name, aktuell, methoden_maske, {", ".join(FELDER)}, katalog_version, zeitpunkt);
+"""
+
+
+def _verbinde(pfad):
+    verbindung = sqlite3.connect(pfad, timeout=5.0, check_same_thread=False)
+    verbindung.execute("PRAGMA journal_mode=WAL")  # Leser blockieren den Schreib-Thread nicht (und umgekehrt)
+    verbindung.execute("PRAGMA synchronous=NORMAL")
+    return verbindung
+
+
+class Historie:
+    """ Gespeicherte Bewertungen: gepuffertes Schreiben im Hintergrund, indizierte Abfragen für die Portfolio-Ansicht """
+
+    def __init__(self, pfad=HISTORIE_DATEI, batch_groesse=BATCH_GROESSE, intervall=SCHREIB_INTERVALL):
+        self.pfad = str(pfad)
+        self.batch_groesse = batch_groesse
+        self.intervall = intervall
+        self._warteschlange = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        with closing(_verbinde(self.pfad)) as verbindung:
+            verbindung.executescript(_SCHEMA)
+
+    # Schreiben
+
+    def speichere(self, system_name, system_description, antworten, katalog_version, testmethoden):
+        """ Reiht eine Bewertung zum Speichern ein und kehrt sofort zurück
+
+        Ungültige Eingaben werden hier abgelehnt, damit sie nicht erst im Schreib-Thread auffallen.
+        """
+        for name, wert in (("system_name", system_name), ("system_description", system_description),
+                           ("katalog_version", katalog_version), *((feld, antworten[feld]) for feld in FELDER)):
+            if not isinstance(wert, str):
+                raise TypeError(f"{name} muss ein String sein, nicht {type(wert).__name__}")
+        testmethoden = tuple(testmethoden)
+        if not all(isinstance(methode, str) for methode in testmethoden):
+            raise TypeError("testmethoden muss aus Strings bestehen")
+        if self._thread is None or not self._thread.is_alive():
+            self._starte_schreiber()
+        zeitpunkt = datetime.datetime.now().isoformat(timespec="seconds")
+        self._warteschlange.put((zeitpunkt, system_name, system_description, *(antworten[feld] for feld in FELDER),
+                                 katalog_version, testmethoden))
+
+    def warte(self, frist=WARTE_FRIST):
+        """ Blockiert, bis alle eingereihten Bewertungen geschrieben sind, höchstens `frist` Sekunden
+
+        Gibt zurück, ob die Warteschlange leer ist; so kann das Beenden des Prozesses nie dauerhaft hängen.
+        """
+        ende = time.monotonic() + frist
+        with self._warteschlange.all_tasks_done:
+            while self._warteschlange.unfinished_tasks:
+                rest = ende - time.monotonic()
+                if rest <= 0:
+                    logger.warning("%d Bewertungen nach %.0f s noch nicht gespeichert",
+                                   self._warteschlange.unfinished_tasks, frist)
+                    return False
+                self._warteschlange.all_tasks_done.wait(rest)
+        return True
+
+    def _starte_schreiber(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    atexit.register(self.warte)
+                self._thread = threading.Thread(target=self._schreibe_laufend, name="historie-schreiber", daemon=True)
+                self._thread.start()
+
+    def _schreibe_laufend(self):
+        verbindung, bits = None, None
+        while True:
+            stapel = [self._warteschlange.get()]
+            try:
+                while len(stapel) < self.batch_groesse:
+                    stapel.append(self._warteschlange.get(timeout=self.intervall))
+            except queue.Empty:
+                pass
+            try:
+                if verbindung is None:
+                    verbindung = _verbinde(self.pfad)
+                if bits is None:
+                    bits = dict(verbindung.execute("SELECT name, bit FROM methoden"))
+                with verbindung:
+                    self._schreibe_stapel(verbindung, bits, stapel)
+            except Exception:
+                # Jeder Fehler verwirft nur diesen Stapel; der Thread läuft weiter, damit die Warteschlange nicht volläuft
+                logger.exception("%d Bewertungen konnten nicht gespeichert werden", len(stapel))
+                bits = None  # Zuordnung nach dem Rollback beim nächsten Stapel neu lesen
+                if verbindung is not None:
+                    try:
+                        verbindung.close()
+                    except sqlite3.Error:
+                        pass
+                verbindung = None  # Verbindung beim nächsten Stapel neu aufbauen
+            finally:
+                for _ in stapel:
+                    self._warteschlange.task_done()
+
+    def _schreibe_stapel(self, verbindung, bits, stapel):
+        """ Schreibt einen Stapel in der laufenden Transaktion und pflegt die Markierung der aktuellen Bewertung """
+        # System-Name -> letzte Position im Stapel; Bewertungen ohne Namen gelten jeweils als eigenes System und lösen
+        # keine früheren ab, sonst fielen in der Ansicht "Nur letzte Bewertung je System" alle zu einer zusammen
+        letzte = {zeile[1]: i for i, zeile in enumerate(stapel) if zeile[1].strip()}
+        verbindung.executemany("UPDATE bewertungen SET aktuell = 0 WHERE system_name = ? AND aktuell = 1",
+                               [(name,) for name in letzte])
+        verbindung.executemany(
+            f"INSERT INTO bewertungen (zeitpunkt, system_name, system_description, {', '.join(FELDER)}, "
+            f"katalog_version, methoden_maske, testmethoden, aktuell) VALUES ({', '.join('?' * (len(FELDER) + 7))})",
+            [(*zeile[:-1], self._maske(verbindung, bits, zeile[-1]), "\n".join(zeile[-1]), int(letzte.get(zeile[1], i) == i))
+             for i, zeile in enumerate(stapel)])
+
+    @staticmethod
+    def _maske(verbindung, bits, testmethoden):
+        maske = 0
+        for methode in testmethoden:
+            if methode not in bits:
+                bit = len(bits)
+                if bit >= MAX_METHODEN:
+                    raise ValueError(f"Mehr als {MAX_METHODEN} Testmethoden in der Historie")
+                verbindung.execute("INSERT INTO methoden (bit, name) VALUES (?, ?)", (bit, methode))
+                bits[methode] = bit
+            maske |= 1 << bits[methode]
+        return maske
+
+    # Abfragen
+
+    def _bedingung(self, verbindung, filterwerte, auswertung=False):
+        """ WHERE-Klausel und Parameter aus den Filtern; unbekannte Filter werden abgelehnt
+
+        Mit Namensfilter wird immer der abdeckende Namens-Index erzwungen, für Auswertungen ohne Bereichsfilter (Name,
+        Zeitraum) der abdeckende Auswertungs-Index - SQLite würde sonst oft einen Index wählen, der für jeden Treffer
+        die Tabellenzeile nachlädt.
+        """
+        teile, parameter = [], []
+        for name, wert in filterwerte.items():
+            if wert is None or wert == "" or wert is False:
+                continue
+            if name == "system_name":
+                teile.append("system_name >= ? AND system_name < ?")  # Präfixsuche über den Index
+                parameter += [wert, wert + "\U0010ffff"]
+            elif name in FILTER_SPALTEN:
+                teile.append(f"{name} = ?")
+                parameter.append(wert)
+            elif name == "von":
+                teile.append("zeitpunkt >= ?")
+                parameter.append(str(wert))
+            elif name == "bis":
+                teile.append("zeitpunkt < ?")
+                parameter.append(str(wert))
+            elif name == "methode":
+                bit = verbindung.execute("SELECT bit FROM methoden WHERE name = ?", (wert,)).fetchone()
+                teile.append("methoden_maske & ? != 0")
+                parameter.append(1 << bit[0] if bit else 0)
+            elif name == "nur_aktuelle":
+                teile.append("aktuell = 1")  # nur die jeweils letzte Bewertung je System
+            else:
+                raise ValueError(f"Unbekannter Filter: {name}")
+        if not teile:
+            return "", parameter
+        if filterwerte.get("system_name"):
+            index = " INDEXED BY ix_bewertungen_name_auswertung"
+        elif auswertung and not (filterwerte.get("von") or filterwerte.get("bis")):
+            index = " INDEXED BY ix_bewertungen_auswertung"
+        else:
+            index = ""
+        return f"{index} WHERE {' AND '.join(teile)}", parameter
+
+    def anzahl(self, **filterwerte):
+        """ Anzahl gespeicherter Bewertungen, die zu den Filtern passen """
+        with closing(_verbinde(self.pfad)) as verbindung:
+            bedingung, parameter = self._bedingung(verbindung, filterwerte, auswertung=True)
+            return verbindung.execute(f"SELECT COUNT(*) FROM bewertungen{bedingung}", parameter).fetchone()[0]
+
+    def haeufigkeiten(self, **filterwerte):
+        """ Wie viele der gefilterten Bewertungen welche Testmethode enthalten, absteigend sortiert """
+        with closing(_verbinde(self.pfad)) as verbindung:
+            bedingung, parameter = self._bedingung(verbindung, filterwerte, auswertung=True)
+            masken = verbindung.execute(
+                f"SELECT methoden_maske, COUNT(*) FROM bewertungen{bedingung} GROUP BY methoden_maske", parameter
+            ).fetchall()
+            methoden = verbindung.execute("SELECT bit, name FROM methoden").fetchall()
+        zaehler = {name: sum(anzahl for maske, anzahl in masken if maske >> bit & 1) for bit, name in methoden}
+        return sorted(((name, anzahl) for name, anzahl in zaehler.items() if anzahl), key=lambda e: -e[1])
+
+    def seite(self, nach_id=None, groesse=SEITEN_GROESSE, **filterwerte):
+        """ Eine Seite der gefilterten Bewertungen, neueste zuerst
+
+        Blättern über die ID der letzten Zeile (Keyset), damit auch hintere Seiten nur `groesse` Zeilen lesen. Die IDs
+        der Seite werden zuerst allein aus dem Index bestimmt und sortiert, erst danach werden ihre Zeilen gelesen.
+        Gibt die Zeilen als Dicts und die ID für die nächste Seite (oder None) zurück.
+        """
+        with closing(_verbinde(self.pfad)) as verbindung:
+            bedingung, parameter = self._bedingung(verbindung, filterwerte)
+            if nach_id is not None:
+                bedingung += (" AND " if bedingung else " WHERE ") + "id < ?"
+                parameter.append(nach_id)
+            cursor = verbindung.execute(
+                f"SELECT id, zeitpunkt, system_name, system_description, {', '.join(FELDER)}, katalog_version, "
+                f"testmethoden FROM bewertungen WHERE id IN (SELECT id FROM bewertungen{bedingung} "
+                f"ORDER BY id DESC LIMIT ?) ORDER BY id DESC", [*parameter, groesse + 1])
+            spalten = [beschreibung[0] for beschreibung in cursor.description]
+            zeilen = [dict(zip(spalten, zeile)) for zeile in cursor.fetchall()]
+        naechste = zeilen[groesse - 1]["id"] if len(zeilen) > groesse else None
+        return zeilen[:groesse], naechste
+
+
+_historie = None
+_historie_fehler = None
+_historie_lock = threading.Lock()
+
+
+def historie():
+    """ Prozessweite Historie (von allen Sitzungen geteilt)
+
+    Gibt None zurück, wenn sich die Datenbank nicht öffnen lässt (z. B. nicht beschreibbares Verzeichnis). Das Tool
+    arbeitet dann ohne Historie weiter; der Fehler wird einmal protokolliert und nicht bei jedem Aufruf neu versucht.
+    """
+    global _historie, _historie_fehler
+    if _historie is None and _historie_fehler is None:
+        with _historie_lock:
+            if _historie is None and _historie_fehler is None:
+                try:
+                    _historie = Historie(HISTORIE_DATEI)
+                except sqlite3.Error as fehler:
+                    _historie_fehler = fehler
+                    logger.error("Historie %s kann nicht geöffnet werden, Bewertungen werden nicht gespeichert: %s",
+                                 HISTORIE_DATEI, fehler)
+    return _historie
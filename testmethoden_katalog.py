@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+
+from testmethoden_regeln import REGELN
+
+# Katalog der Testmethoden (Beschreibung, häufige Probleme, Best Practices und Tools)
+# Die Inhalte liegen in testmethoden_katalog.json und werden einmal pro Prozess in unveränderliche Datensätze geladen,
+# die sich alle Sitzungen teilen. Ändert sich die Datei, wird beim nächsten Zugriff der neue Stand geladen und als
+# Ganzes ausgetauscht - ohne Neustart. Die Reihenfolge in der Datei entspricht der Anzeigereihenfolge im Tool.
+
+KATALOG_DATEI = Path(os.environ.get("TESTMETHODEN_KATALOG", Path(__file__).parent / "testmethoden_katalog.json"))
+PRUEF_INTERVALL = 2.0  # Sekunden zwischen zwei Prüfungen der Änderungszeit
+
+logger = logging.getLogger("testmethoden")
+
+
+@dataclass(frozen=True, slots=True)
+class Testmethode:
+    name: str
+    description: str
+    problems: tuple
+    best_practices: tuple
+    tools: MappingProxyType  # Kategorie -> Tupel von Tools
+    markdown: str  # vorbereitete Darstellung für die Oberfläche
+    schlagworte: tuple = ()  # zusätzliche Suchbegriffe (deutsch/englisch) für die Freitext-Suche
+
+
+@dataclass(frozen=True, slots=True)
+class Katalog:
+    version: str
+    methoden: MappingProxyType  # Name -> Testmethode, in Anzeigereihenfolge
+
+
+def _markdown(name, description, problems, best_practices, tools):
+    """ Setzt die komplette Darstellung einer Testmethode als einen Markdown-Block zusammen """
+    teile = [f"### {name}", f"**Beschreibung:** {description}"]
+
+    teile.append("Häufige Probleme:")
+    teile.append("\n".join(f"- {problem}" for problem in problems))
+
+    teile.append("Best Practices:")
+    teile.append("\n".join(f"- {practice}" for practice in best_practices))
+
+    teile.append("Eingesetzte Tools:")
+    teile.append("\n".join(f"- **{tool_category}**: {', '.join(tool_list)}" for tool_category, tool_list in tools.items()))
+
+    teile.append("---")
+    return "\n\n".join(teile)
+
+
+def lade_katalog(pfad=KATALOG_DATEI):
+    """ Liest die Katalogdatei und baut daraus einen unveränderlichen Katalog """
+    rohdaten = Path(pfad).read_bytes()
+    daten = json.loads(rohdaten)
+
+    methoden = {}
+    for eintrag in daten["testmethoden"]:
+        tools = MappingProxyType({kategorie: tuple(liste) for kategorie, liste in eintrag["tools"].items()})
+        felder = dict(
+            name=eintrag["name"],
+            description=eintrag["description"],
+            problems=tuple(eintrag["problems"]),
+            best_practices=tuple(eintrag["best_practices"]),
+            tools=tools,
+        )
+        methoden[eintrag["name"]] = Testmethode(**felder, markdown=_markdown(**felder),
+                                                schlagworte=tuple(eintrag.get("schlagworte", ())))
+
+    fehlend = [methode for methode, _ in REGELN if methode not in methoden]
+    if fehlend:
+        raise ValueError(f"Katalog {pfad} enthält keine Einträge für: {', '.join(fehlend)}")
+
+    version = f"{daten.get('version', 0)}-{hashlib.sha256(rohdaten).hexdigest()[:8]}"
+    return Katalog(version=version, methoden=MappingProxyType(methoden))
+
+
+class _KatalogQuelle:
+    """ Hält den aktuellen Katalog und lädt ihn neu, sobald sich die Änderungszeit der Datei ändert """
+
+    def __init__(self, pfad):
+        self.pfad = Path(pfad)
+        self._lock = threading.Lock()
+        self._mtime = self.pfad.stat().st_mtime_ns
+        self._katalog = lade_katalog(self.pfad)
+        self._naechste_pruefung = time.monotonic() + PRUEF_INTERVALL
+
+    def aktuell(self):
+        if time.monotonic() >= self._naechste_pruefung:
+            self._pruefe()
+        return self._katalog
+
+    def _pruefe(self):
+        with self._lock:
+            if time.monotonic() < self._naechste_pruefung:
+                return
+            self._naechste_pruefung = time.monotonic() + PRUEF_INTERVALL
+            try:
+                mtime = self.pfad.stat().st_mtime_ns
+                if mtime == self._mtime:
+                    return
+                neu = lade_katalog(self.pfad)
+            except (OSError, ValueError, KeyError, TypeError) as fehler:
+                # Fehlerhafte Datei: alten Stand behalten, beim nächsten Intervall erneut versuchen
+                logger.error("Katalog konnte nicht neu geladen werden: %s", fehler)
+                return
+            self._mtime = mtime
+            self._katalog = neu  # Austausch als Ganzes: laufende Zugriffe sehen entweder den alten oder den neuen Stand
+            logger.info("Katalog neu geladen, Version %s", neu.version)
+
+
+_quelle = _KatalogQuelle(KATALOG_DATEI)
+
+
+def katalog():
+    """ Aktueller Katalog (von allen Sitzungen geteilt) """
+    return _quelle.aktuell()
+
@@ -0,0 +1,163 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testmethoden_cache import ERGEBNIS_CACHE
+
+# Laufzeit-Messung je Verarbeitungsphase
+# Jede Phase (Eingabeprüfung, Regelauswertung, Rendern, Arbeitsmappe schreiben, Download vorbereiten, ...) wird in ein
+# prozessweites Latenz-Histogramm eingetragen. Zusätzlich werden ausgegebene Elemente und Export-Bytes gezählt.
+# Die Werte stehen als Prometheus-Text zur Verfügung; jeder abgeschlossene Lauf wird als JSON-Zeile protokolliert.
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+logger = logging.getLogger("testmethoden.metriken")
+
+
+class Histogramm:
+    """ Kumulatives Latenz-Histogramm in Sekunden (Prometheus-Semantik) """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.zaehler = [0] * len(buckets)
+        self.anzahl = 0
+        self.summe = 0.0
+
+    def beobachte(self, sekunden):
+        self.anzahl += 1
+        self.summe += sekunden
+        for i, grenze in enumerate(self.buckets):
+            if sekunden <= grenze:
+                self.zaehler[i] += 1
+
+
+class MetrikRegister:
+    """ Thread-sichere Sammlung aller Phasen-Histogramme und Zähler eines Prozesses """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phasen = {}
+        self._zaehler = {"laeufe": 0, "elemente": 0, "export_bytes": 0}
+
+    def beobachte(self, phase, sekunden):
+        with self._lock:
+            self._phasen.setdefault(phase, Histogramm()).beobachte(sekunden)
+
+    def zaehle(self, name, wert=1):
+        with self._lock:
+            self._zaehler[name] = self._zaehler.get(name, 0) + wert
+
+    def phasen_summe(self, phase):
+        """ Aufsummierte Dauer einer Phase in Sekunden """
+        with self._lock:
+            histogramm = self._phasen.get(phase)
+            return histogramm.summe if histogramm else 0.0
+
+    @contextmanager
+    def messe(self, phase):
+        """ Misst die Dauer eines Code-Blocks und trägt sie in das Histogramm der Phase ein """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.beobachte(phase, time.perf_counter() - start)
+
+    def prometheus_text(self):
+        """ Alle Metriken im Prometheus-Textformat """
+        zeilen = [
+            "# HELP testmethoden_phase_dauer_sekunden Dauer der einzelnen Verarbeitungsphasen",
+            "# TYPE testmethoden_phase_dauer_sekunden histogram",
+        ]
+        with self._lock:
+            for phase, histogramm in sorted(self._phasen.items()):
+                for grenze, anzahl in zip(histogramm.buckets, histogramm.zaehler):
+                    zeilen.append(f'testmethoden_phase_dauer_sekunden_bucket{{phase="{phase}",le="{grenze}"}} {anzahl}')
+                zeilen.append(f'testmethoden_phase_dauer_sekunden_bucket{{phase="{phase}",le="+Inf"}} {histogramm.anzahl}')
+                zeilen.append(f'testmethoden_phase_dauer_sekunden_sum{{phase="{phase}"}} {histogramm.summe:.6f}')
+                zeilen.append(f'testmethoden_phase_dauer_sekunden_count{{phase="{phase}"}} {histogramm.anzahl}')
+            zaehler = dict(self._zaehler)
+
+        for name, wert in sorted(zaehler.items()):
+            zeilen.append(f"# TYPE testmethoden_{name}_total counter")
+            zeilen.append(f"testmethoden_{name}_total {wert}")
+
+        cache = ERGEBNIS_CACHE.statistik()
+        for name in ("treffer", "fehlzugriffe", "verdraengungen"):
+            zeilen.append(f"# TYPE testmethoden_cache_{name}_total counter")
+            zeilen.append(f"testmethoden_cache_{name}_total {cache[name]}")
+        for name in ("eintraege", "belegt_bytes", "max_bytes"):
+            zeilen.append(f"# TYPE testmethoden_cache_{name} gauge")
+            zeilen.append(f"testmethoden_cache_{name} {cache[name]}")
+        return "\n".join(zeilen) + "\n"
+
+
+# Gemeinsames Register für den Server-Prozess
+METRIKEN = MetrikRegister()
+
+
+class Lauf:
+    """ Messungen eines einzelnen Durchlaufs (z. B. eines Streamlit-Reruns) für Log und Debug-Ansicht
+
+    Export-Bytes werden nicht hier, sondern beim Download direkt im Register gezählt, da der Download erst nach dem
+    Rerun ausgelöst wird.
+    """
+
+    def __init__(self, art="rerun", register=METRIKEN):
+        self.art = art
+        self.register = register
+        self.start = time.perf_counter()
+        self.phasen = []
+        self.elemente = 0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            dauer = time.perf_counter() - start
+            self.phasen.append((name, dauer))
+            self.register.beobachte(name, dauer)
+
+    def zaehle_elemente(self, anzahl=1):
+        self.elemente += anzahl
+
+    def abschliessen(self):
+        """ Trägt Gesamtdauer und Zähler ins Register ein und schreibt eine strukturierte Log-Zeile """
+        gesamt = time.perf_counter() - self.start
+        self.register.beobachte(self.art, gesamt)
+        self.register.zaehle("laeufe")
+        self.register.zaehle("elemente", self.elemente)
+        logger.info(json.dumps({
+            "lauf": self.art,
+            "gesamt_ms": round(gesamt * 1000, 3),
+            "phasen_ms": [[name, round(dauer * 1000, 3)] for name, dauer in self.phasen],
+            "elemente": self.elemente,
+        }, ensure_ascii=False))
+        return gesamt
+
+
+class _MetrikHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        inhalt = METRIKEN.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(inhalt)))
+        self.end_headers()
+        self.wfile.write(inhalt)
+
+    def log_message(self, format, *args):
+        pass  # Zugriffe auf /metrics nicht protokollieren
+
+
+def starte_metrik_server(port, host="0.0.0.0"):
+    """ Startet einen Hintergrund-Thread, der /metrics im Prometheus-Format ausliefert """
+    server = ThreadingHTTPServer((host, port), _MetrikHandler)
+    threading.Thread(target=server.serve_forever, name="metrik-server", daemon=True).start()
+    return server
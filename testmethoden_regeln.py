@@ -0,0 +1,178 @@
+import itertools
+
+# Regelwerk für die Empfehlung der Testmethoden
+# Jede Regel ist eine Bedingungsmenge je Testmethode: Für jedes genannte Feld muss die Antwort in der Menge
+# der erlaubten Optionen liegen, nicht genannte Felder sind beliebig. Die Regeln werden beim Import einmalig
+# in Bitmasken übersetzt und über den gesamten Antwortraum zu einem Index vorberechnet.
+
+PLATZHALTER = "Bitte auswählen"
+
+# Auswahlfelder der Systemklassifikation mit ihren gültigen Optionen (ohne Platzhalter)
+FELDER = {
+    "system_type": ("Neuentwicklung", "Migration", "Update"),
+    "environment": ("On-Premise", "Cloud"),
+    "real_time_processing": ("Ja", "Nein"),
+    "data_sensitivity": ("Technische Logdaten", "Personenbezogene/Firmenkritische Daten"),
+    "regulatory_requirements": ("Ja", "Nein"),
+    "availability": ("Ja", "Nein"),
+    "high_api_dependence": ("Ja", "Nein"),
+    "deployment_frequency": ("Monatlich", "Wöchentlich", "Täglich"),
+}
+
+# Bedingungen je Testmethode (Reihenfolge = Anzeigereihenfolge)
+REGELN = (
+    ("Datenmigrationstests", {"system_type": {"Migration"}}),
+    ("Regressionstests", {"system_type": {"Update"}}),
+    ("Disaster Recovery Tests", {"real_time_processing": {"Ja"}, "environment": {"Cloud"}}),
+    ("Sicherheitstests", {"data_sensitivity": {"Personenbezogene/Firmenkritische Daten"}}),
+    ("Compliance-Sicherheitstests", {"regulatory_requirements": {"Ja"}}),
+    ("Cloud Performance-Tests", {"availability": {"Ja"}, "environment": {"Cloud"}}),
+    ("Performance-Tests", {"availability": {"Ja"}, "environment": {"On-Premise"}}),
+    ("API-Tests", {"high_api_dependence": {"Ja"}}),
+    ("Statische Code-Analyse", {"deployment_frequency": {"Täglich", "Wöchentlich"}}),
+    ("User Acceptance Tests (UAT)", {}),
+    ("End-to-End-Tests", {}),
+)
+
+
+def _bit_positionen(felder):
+    """ Vergibt jeder Option jedes Feldes ein eigenes Bit """
+    positionen = {}
+    bit = 0
+    for feld, optionen in felder.items():
+        for option in optionen:
+            positionen[(feld, option)] = 1 << bit
+            bit += 1
+    return positionen
+
+
+def kompiliere_regeln(regeln, felder):
+    """ Übersetzt die Bedingungen in Bitmasken: Eine Regel greift, wenn alle Antwort-Bits in ihrer Maske liegen """
+    positionen = _bit_positionen(felder)
+    kompiliert = []
+    for methode, bedingungen in regeln:
+        unbekannt = set(bedingungen) - set(felder)
+        if unbekannt:
+            raise ValueError(f"Regel '{methode}' verweist auf unbekannte Felder: {sorted(unbekannt)}")
+        maske = 0
+        for feld, optionen in felder.items():
+            erlaubt = bedingungen.get(feld, optionen)
+            for option in erlaubt:
+                if (feld, option) not in positionen:
+                    raise ValueError(f"Regel '{methode}': ungültige Option '{option}' für Feld '{feld}'")
+                maske |= positionen[(feld, option)]
+        kompiliert.append((methode, maske))
+    return positionen, tuple(kompiliert)
+
+
+def antwortraum(felder=FELDER):
+    """ Liefert alle gültigen Antwortkombinationen in fester Reihenfolge """
+    return itertools.product(*felder.values())
+
+
+def baue_index(regeln=REGELN, felder=FELDER):
+    """ Wertet alle Regeln einmalig für den gesamten Antwortraum aus """
+    positionen, kompiliert = kompiliere_regeln(regeln, felder)
+    index = {}
+    for antworten in antwortraum(felder):
+        bits = 0
+        for feld, antwort in zip(felder, antworten):
+            bits |= positionen[(feld, antwort)]
+        index[antworten] = tuple(methode for methode, maske in kompiliert if bits & ~maske == 0)
+    return index
+
+
+# Einmalig beim Import vorberechnet (aktuell 576 Kombinationen)
+EMPFEHLUNGS_INDEX = baue_index()
+
+
+def normalisiere(antworten):
+    """ Bringt die Antworten (dict mit Feldnamen oder Sequenz in Feldreihenfolge) in die Form des Index-Schlüssels """
+    if isinstance(antworten, dict):
+        return tuple(antworten.get(feld) for feld in FELDER)
+    return tuple(antworten)
+
+
+def empfohlene_testmethoden(antworten):
+    """ Gibt die empfohlenen Testmethoden für eine vollständige Klassifikation zurück (ein Index-Zugriff) """
+    schluessel = normalisiere(antworten)
+    try:
+        return EMPFEHLUNGS_INDEX[schluessel]
+    except KeyError:
+        raise ValueError(f"Unvollständige oder ungültige Klassifikation: {schluessel}") from None
+
+
+def stellenwerte(felder=FELDER):
+    """ Stellenwerte je Feld, mit denen eine Antwortkombination auf ihre laufende Nummer im Antwortraum abgebildet wird """
+    werte = []
+    faktor = 1
+    for optionen in reversed(tuple(felder.values())):
+        werte.append(faktor)
+        faktor *= len(optionen)
+    return dict(zip(felder, reversed(werte)))
+
+
+# Derselbe Index als Tupel in Antwortraum-Reihenfolge, adressiert über die laufende Nummer (für Massenauswertungen)
+EMPFEHLUNGS_LISTE = tuple(EMPFEHLUNGS_INDEX.values())
+
+
+# Live-Auswertung: Testmethoden je Feld, deren Regel dieses Feld verwendet. Ändert sich eine Antwort, müssen nur diese
+# Regeln neu geprüft werden; alle anderen Methoden bleiben unverändert.
+_BEDINGUNGEN = dict(REGELN)
+REGELN_JE_FELD = {feld: tuple(methode for methode, bedingungen in REGELN if feld in bedingungen) for feld in FELDER}
+
+
+def regel_greift(methode, antworten):
+    """ Prüft eine einzelne Regel; ein noch nicht beantwortetes Feld erfüllt keine Bedingung """
+    return all(antworten.get(feld) in erlaubt for feld, erlaubt in _BEDINGUNGEN[methode].items())
+
+
+def teil_empfehlung(antworten):
+    """ Empfohlene Testmethoden für eine (auch unvollständige) Klassifikation als Menge """
+    return frozenset(methode for methode, _ in REGELN if regel_greift(methode, antworten))
+
+
+def aktualisiere_empfehlung(bisher, antworten, feld):
+    """ Wertet nach der Änderung eines Feldes nur die davon abhängigen Regeln neu aus
+
+    Gibt die neue Methodenmenge sowie die hinzugekommenen und die weggefallenen Methoden zurück.
+    """
+    neu = set(bisher)
+    for methode in REGELN_JE_FELD[feld]:
+        if regel_greift(methode, antworten):
+            neu.add(methode)
+        else:
+            neu.discard(methode)
+    neu = frozenset(neu)
+    return neu, neu - bisher, bisher - neu
+
+
+def feldgruppen(regeln=REGELN, felder=FELDER):
+    """ Fasst Felder, die gemeinsam in einer Regel vorkommen, zu Gruppen zusammen
+
+    Liefert je Gruppe (Felder, Testmethoden) in Feld- bzw. Anzeigereihenfolge. Eine Änderung innerhalb einer Gruppe
+    kann nur deren Testmethoden betreffen; Methoden ohne Bedingungen gehören zu keiner Gruppe. Jede Gruppe umfasst
+    zusammenhängende Felder, damit der Live-Modus die Fragen in derselben Reihenfolge wie das Formular zeigen kann -
+    liegen Felder einer Gruppe auseinander, werden die Felder dazwischen mit aufgenommen.
+    """
+    gruppe_von = {feld: {feld} for feld in felder}
+    for _, bedingungen in regeln:
+        vereint = set().union(*(gruppe_von[feld] for feld in bedingungen))
+        for feld in vereint:
+            gruppe_von[feld] = vereint
+    reihenfolge = list(felder)
+    bereiche = []  # [erste Position, letzte Position] je Gruppe
+    for position, feld in enumerate(reihenfolge):
+        ende = max(reihenfolge.index(f) for f in gruppe_von[feld])
+        if bereiche and position <= bereiche[-1][1]:
+            bereiche[-1][1] = max(bereiche[-1][1], ende)
+        else:
+            bereiche.append([position, ende])
+    gruppen = []
+    for anfang, ende in bereiche:
+        gruppe = tuple(reihenfolge[anfang:ende + 1])
+        gruppen.append((gruppe, tuple(methode for methode, bedingungen in regeln if set(bedingungen) & set(gruppe))))
+    return tuple(gruppen)
+
+# Feldgruppen für den Live-Modus (einmalig beim Import)
+LIVE_GRUPPEN = feldgruppen()
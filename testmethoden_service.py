@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from testmethoden_export import EXCEL_MIME, eingabe_hash, empfehlungs_eintraege, excel_export
+from testmethoden_katalog import katalog
+from testmethoden_metriken import METRIKEN
+from testmethoden_regeln import FELDER
+from testmethoden_suche import vorschlaege
+
+# Schlanker JSON/HTTP-Dienst (ASGI) für CI-Pipelines: liefert zu einer Klassifikation dieselben Testmethoden wie die
+# Oberfläche, ohne Streamlit-Sitzung. Die Excel-Erzeugung läuft in einem Worker-Pool, damit langsame Exporte die
+# schnellen Abfragen nicht blockieren.
+#
+# Start:   python testmethoden_service.py --port 8600          (benötigt uvicorn)
+# Abfrage: curl -X POST localhost:8600/empfehlung -d '{"system_type": "Update", ...}'
+#
+#   POST /empfehlung          JSON mit den acht Klassifikationsfeldern (optional system_name, system_description)
+#                             -> {"testmethoden": [...], "hinweise": [...], "katalog_version": ...}
+#                             mit ?excel=1 zusätzlich "excel_base64"
+#   POST /empfehlung.xlsx     gleiche Eingabe -> Excel-Datei als Download
+#   GET  /felder              gültige Optionen je Feld
+#   GET  /metrics             Latenz-Histogramme und Zähler im Prometheus-Textformat
+#   GET  /gesundheit          Lebenszeichen
+
+MAX_BODY_BYTES = 64 * 1024
+EXPORT_WORKER = int(os.environ.get("TESTMETHODEN_EXPORT_WORKER", 4))
+
+_export_pool = ThreadPoolExecutor(max_workers=EXPORT_WORKER, thread_name_prefix="excel-export")
+
+
+class AnfrageFehler(Exception):
+    """ Fehlerhafte Anfrage, wird als JSON-Fehlermeldung mit HTTP-Status beantwortet """
+
+    def __init__(self, status, meldung, details=None):
+        super().__init__(meldung)
+        self.status = status
+        self.meldung = meldung
+        self.details = details
+
+
+def pruefe_klassifikation(daten):
+    """ Prüft die acht Klassifikationsfelder und gibt die Antworten in Feldreihenfolge zurück """
+    if not isinstance(daten, dict):
+        raise AnfrageFehler(400, "Der Anfrageinhalt muss ein JSON-Objekt sein.")
+    fehler = {}
+    for feld, optionen in FELDER.items():
+        wert = daten.get(feld)
+        if wert not in optionen:
+            fehler[feld] = f"Erwartet eine von: {', '.join(optionen)}"
+    if fehler:
+        raise AnfrageFehler(422, "Bitte füllen Sie alle Felder aus, bevor Sie Testmethoden anzeigen.", fehler)
+    return {feld: daten[feld] for feld in FELDER}
+
+
+async def _lese_body(receive):
+    teile = []
+    groesse = 0
+    while True:
+        nachricht = await receive()
+        teil = nachricht.get("body", b"")
+        groesse += len(teil)
+        if groesse > MAX_BODY_BYTES:
+            raise AnfrageFehler(413, "Anfrage zu groß.")
+        teile.append(teil)
+        if not nachricht.get("more_body", False):
+            return b"".join(teile)
+
+
+async def _lese_json(receive):
+    try:
+        return json.loads(await _lese_body(receive) or b"{}")
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise AnfrageFehler(400, "Ungültiges JSON.") from None
+
+
+async def _antworte(send, status, inhalt, content_type="application/json; charset=utf-8", header=()):
+    if not isinstance(inhalt, bytes):
+        inhalt = json.dumps(inhalt, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode("latin-1")),
+                    (b"content-length", str(len(inhalt)).encode("latin-1")),
+                    *header],
+    })
+    await send({"type": "http.response.body", "body": inhalt})
+
+
+async def _excel_im_pool(daten, antworten, test_recommendations, katalog_version):
+    """ Baut (oder holt aus dem Ergebnis-Cache) die Excel-Datei in einem Worker-Thread """
+    system_name = str(daten.get("system_name", ""))
+    system_description = str(daten.get("system_description", ""))
+    schluessel = eingabe_hash(system_name, system_description, antworten)
+    loop = asyncio.get_running_loop()
+    with METRIKEN.messe("download_vorbereitung"):
+        excel = await loop.run_in_executor(_export_pool, excel_export, schluessel, system_name, system_description,
+                                           test_recommendations, katalog_version)
+    METRIKEN.zaehle("export_bytes", len(excel))
+    return excel
+
+
+async def _empfehlung(scope, receive, send):
+    daten = await _lese_json(receive)
+    with METRIKEN.messe("eingabepruefung"):
+        antworten = pruefe_klassifikation(daten)
+    katalog_stand = katalog()
+    with METRIKEN.messe("regelauswertung"):
+        test_recommendations = empfehlungs_eintraege(antworten, katalog_stand)
+
+    if scope["path"].endswith(".xlsx"):
+        excel = await _excel_im_pool(daten, antworten, test_recommendations, katalog_stand.version)
+        await _antworte(send, 200, excel, EXCEL_MIME,
+                        [(b"content-disposition", b'attachment; filename="Testmethoden_Empfehlung.xlsx"')])
+        return
+
+    testmethoden = [rec["Testmethode"] for rec in test_recommendations]
+    with METRIKEN.messe("freitext_abgleich"):
+        hinweise = vorschlaege(str(daten.get("system_description", "")), set(testmethoden), katalog_stand)
+    antwort = {
+        "testmethoden": testmethoden,
+        "hinweise": [{"testmethode": methode, "konfidenz": round(konfidenz, 3)} for methode, konfidenz in hinweise],
+        "katalog_version": katalog_stand.version,
+    }
+    if parse_qs(scope.get("query_string", b"").decode("latin-1")).get("excel", ["0"])[0] in ("1", "true", "ja"):
+        excel = await _excel_im_pool(daten, antworten, test_recommendations, katalog_stand.version)
+        antwort["excel_base64"] = base64.b64encode(excel).decode("ascii")
+    await _antworte(send, 200, antwort)
+
+
+ROUTEN = {
+    ("POST", "/empfehlung"): _empfehlung,
+    ("POST", "/empfehlung.xlsx"): _empfehlung,
+}
+
+
+async def app(scope, receive, send):
+    """ ASGI-Anwendung """
+    if scope["type"] == "lifespan":
+        while True:
+            nachricht = await receive()
+            if nachricht["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif nachricht["type"] == "lifespan.shutdown":
+                _export_pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    methode, pfad = scope["method"], scope["path"].rstrip("/") or "/"
+    try:
+        if methode == "GET" and pfad == "/gesundheit":
+            await _antworte(send, 200, {"status": "ok", "katalog_version": katalog().version})
+        elif methode == "GET" and pfad == "/metrics":
+            await _antworte(send, 200, METRIKEN.prometheus_text().encode("utf-8"),
+                            "text/plain; version=0.0.4; charset=utf-8")
+        elif methode == "GET" and pfad == "/felder":
+            await _antworte(send, 200, {feld: list(optionen) for feld, optionen in FELDER.items()})
+        elif (methode, pfad) in ROUTEN:
+            with METRIKEN.messe("anfrage"):
+                await ROUTEN[(methode, pfad)](dict(scope, path=pfad), receive, send)
+        else:
+            raise AnfrageFehler(404, f"Unbekannter Endpunkt: {methode} {pfad}")
+    except AnfrageFehler as fehler:
+        inhalt = {"fehler": fehler.meldung}
+        if fehler.details:
+            inhalt["details"] = fehler.details
+        await _antworte(send, fehler.status, inhalt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON/HTTP-Dienst für Testmethoden-Empfehlungen starten.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.exit(1, "Für den Dienst wird uvicorn benötigt (pip install uvicorn).\n")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import math
+import re
+import threading
+from collections import Counter
+
+from testmethoden_katalog import katalog
+
+# Freitext-Abgleich der Kurzbeschreibung mit dem Testmethoden-Katalog
+# Aus Name, Beschreibung, Problemen, Best Practices, Tools und Schlagworten jeder Methode wird einmal je Katalogversion
+# eine TF-IDF-Matrix aufgebaut. Eine Beschreibung (deutsch oder englisch) wird in dieselben Terme zerlegt und per
+# Kosinus-Ähnlichkeit bewertet; dabei werden nur die Spalten der tatsächlich vorkommenden Terme gelesen. numpy wird erst
+# geladen, wenn eine Beschreibung bewertet wird, damit der Kaltstart der Oberfläche ohne numpy auskommt.
+
+STANDARD_SCHWELLE = 0.15  # Mindest-Konfidenz für einen Vorschlag
+STANDARD_ANZAHL = 3
+
+# Gewichtung der Katalogfelder (Name und Schlagworte sind aussagekräftiger als Fließtext)
+_GEWICHT_NAME = 3
+_GEWICHT_SCHLAGWORTE = 3
+
+_STOPPWOERTER = frozenset("""
+    aber alle als also am an auch auf aus bei bis bzw das dass dem den der des die dies diese dieser durch ein eine
+    einem einen einer eines es fuer hat ist im in ins ist kann keine mit muss nach nicht noch nur oder ohne sehr sich
+    sie sind so ueber um und uns unter vom von vor wenn werden wird wie zu zum zur
+    a an and are as at be by for from has have in into is it its of on or that the this to was we will with our
+""".split())
+
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_ENDUNGEN = ("ungen", "ung", "en", "er", "es", "e", "s")
+
+
+def _stamm(wort):
+    """ Sehr leichte Stammformreduktion, damit z. B. 'Migration'/'migrations' oder 'Tests'/'Test' zusammenfallen """
+    for endung in _ENDUNGEN:
+        if len(wort) - len(endung) >= 4 and wort.endswith(endung):
+            return wort[:-len(endung)]
+    return wort
+
+
+def terme(text):
+    """ Zerlegt einen Text in normalisierte Suchterme """
+    text = text.lower().translate(_UMLAUTE)
+    return [_stamm(wort) for wort in re.findall(r"[a-z0-9]+", text) if len(wort) > 1 and wort not in _STOPPWOERTER]
+
+
+class SuchIndex:
+    """ TF-IDF-Matrix über alle Testmethoden eines Katalogstands """
+
+    def __init__(self, katalog_stand):
+        import numpy as np  # erst beim ersten Freitext-Abgleich laden, nicht beim Start der Oberfläche
+
+        self.version = katalog_stand.version
+        self.methoden = tuple(katalog_stand.methoden)
+
+        dokumente = []
+        for methode in katalog_stand.methoden.values():
+            zaehler = Counter()
+            for _ in range(_GEWICHT_NAME):
+                zaehler.update(terme(methode.name))
+            for _ in range(_GEWICHT_SCHLAGWORTE):
+                zaehler.update(terme(" ".join(methode.schlagworte)))
+            zaehler.update(terme(" ".join((methode.description, *methode.problems, *methode.best_practices))))
+            zaehler.update(terme(" ".join(f"{kategorie} {' '.join(tools)}" for kategorie, tools in methode.tools.items())))
+            dokumente.append(zaehler)
+
+        self.vokabular = {term: i for i, term in enumerate(sorted(set().union(*dokumente)))}
+        dokumentfrequenz = Counter(term for zaehler in dokumente for term in zaehler)
+        anzahl = len(dokumente)
+        self.idf = np.array([math.log((1 + anzahl) / (1 + dokumentfrequenz[term])) + 1 for term in self.vokabular],
+                            dtype=np.float32)
+
+        matrix = np.zeros((anzahl, len(self.vokabular)), dtype=np.float32)
+        for zeile, zaehler in enumerate(dokumente):
+            for term, tf in zaehler.items():
+                matrix[zeile, self.vokabular[term]] = (1 + math.log(tf)) * self.idf[self.vokabular[term]]
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        # Spaltenweise abgelegt: für eine Anfrage werden nur die Spalten ihrer Terme gelesen
+        self.matrix_t = np.ascontiguousarray(matrix.T)
+
+    def _anfrage(self, text):
+        """ Sparse Anfragevektor als (Term-Spalten, Gewichte) """
+        import numpy as np
+
+        zaehler = Counter(term for term in terme(text) if term in self.vokabular)
+        if not zaehler:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        spalten = np.fromiter((self.vokabular[term] for term in zaehler), dtype=np.int64, count=len(zaehler))
+        gewichte = np.fromiter((1 + math.log(tf) for tf in zaehler.values()), dtype=np.float32, count=len(zaehler))
+        gewichte *= self.idf[spalten]
+        gewichte /= np.linalg.norm(gewichte)
+        return spalten, gewichte
+
+    def bewerte(self, text):
+        """ Kosinus-Ähnlichkeit eines Textes zu allen Testmethoden """
+        spalten, gewichte = self._anfrage(text)
+        return gewichte @ self.matrix_t[spalten]
+
+    def bewerte_stapel(self, texte):
+        """ Ähnlichkeiten vieler Texte auf einmal, Ergebnis hat die Form (Anzahl Texte, Anzahl Methoden) """
+        import numpy as np
+
+        anfragen = [self._anfrage(text) for text in texte]
+        zeilen = np.repeat(np.arange(len(anfragen)), [len(spalten) for spalten, _ in anfragen])
+        if not len(zeilen):
+            return np.zeros((len(anfragen), len(self.methoden)), dtype=np.float32)
+        spalten = np.concatenate([spalten for spalten, _ in anfragen])
+        gewichte = np.concatenate([gewichte for _, gewichte in anfragen])
+        ergebnis = np.zeros((len(anfragen), len(self.methoden)), dtype=np.float32)
+        np.add.at(ergebnis, zeilen, self.matrix_t[spalten] * gewichte[:, None])
+        return ergebnis
+
+    def auswahl(self, bewertungen, ausgeschlossen=(), schwelle=STANDARD_SCHWELLE, anzahl=STANDARD_ANZAHL):
+        """ Beste Methoden oberhalb der Schwelle als Liste von (Methode, Konfidenz) """
+        import numpy as np
+
+        vorschlaege = []
+        for i in np.argsort(-bewertungen):
+            if len(vorschlaege) >= anzahl or bewertungen[i] < schwelle:
+                break
+            if self.methoden[i] not in ausgeschlossen:
+                vorschlaege.append((self.methoden[i], float(bewertungen[i])))
+        return vorschlaege
+
+
+_indizes = {}
+_lock = threading.Lock()
+
+
+def such_index(katalog_stand=None):
+    """ Suchindex zum (aktuellen) Katalogstand, einmal je Katalogversion aufgebaut """
+    katalog_stand = katalog_stand or katalog()
+    index = _indizes.get(katalog_stand.version)
+    if index is None:
+        with _lock:
+            index = _indizes.get(katalog_stand.version)
+            if index is None:
+                index = SuchIndex(katalog_stand)
+                _indizes.clear()  # ältere Katalogstände werden nicht mehr gebraucht
+                _indizes[katalog_stand.version] = index
+    return index
+
+
+def vorschlaege(beschreibung, ausgeschlossen=(), katalog_stand=None, schwelle=STANDARD_SCHWELLE,
+                anzahl=STANDARD_ANZAHL):
+    """ Schlägt anhand der Kurzbeschreibung Testmethoden vor, die nicht bereits empfohlen sind """
+    if not beschreibung or not beschreibung.strip():
+        return []
+    index = such_index(katalog_stand)
+    return index.auswahl(index.bewerte(beschreibung), ausgeschlossen, schwelle, anzahl)